@@ -1,9 +1,89 @@
 import googlemaps
+import numpy as np
 from datetime import datetime
-from polyline import decode, encode
-from math import sqrt
+from polyline import decode
+from math import radians, cos, ceil
 
-from typing import Tuple, Dict, List
+from typing import Tuple, Dict, List, NamedTuple
+
+
+class StopPoint(NamedTuple):
+    """
+    Point on the route.
+
+    Attributes:
+        lat (float): Lattitude of the point.
+        lng (float): Longtitude of the point.
+        distance (int): Distance from the beginning of the route to the point (in meters).
+    """
+
+    lat: float
+    lng: float
+    distance: int
+
+
+# shorter polylines (about 20 vertices) are decoded faster by polyline library than by fixed NumPy overhead
+_NUMPY_DECODE_MIN_LENGTH: int = 100
+
+
+def _decode_np(polyline_str: str, precision: int = 5) -> np.ndarray:
+    """
+    Decode polyline string into array of coordinates.
+    All varint chunks of long polyline are decoded at once by NumPy, no Python object is created per coordinate.
+    Short polyline is decoded by polyline library.
+
+    Args:
+        polyline_str (str): Encoded polyline.
+        precision (int, optional): Precision of the encoded coordinates. Defaults to 5.
+
+    Returns:
+        np.ndarray: array of shape (N, 2) with lattitude and longtitude of each polyline vertex.
+    """
+
+    if len(polyline_str) < _NUMPY_DECODE_MIN_LENGTH:
+        return np.asarray(decode(polyline_str, precision), dtype=np.float64).reshape(-1, 2)
+
+    chunks: np.ndarray = np.frombuffer(polyline_str.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+
+    # every value ends with the chunk which does not have continuation bit 0x20
+    is_last_chunk: np.ndarray = chunks < 0x20
+    chunks_count: int = int(np.flatnonzero(is_last_chunk)[-1]) + 1 if is_last_chunk.any() else 0
+    chunks, is_last_chunk = chunks[:chunks_count], is_last_chunk[:chunks_count]
+
+    if chunks_count == 0:
+        return np.empty((0, 2), dtype=np.float64)
+
+    value_starts: np.ndarray = np.flatnonzero(np.concatenate(([True], is_last_chunk[:-1])))
+    value_ids: np.ndarray = np.cumsum(is_last_chunk) - is_last_chunk
+    shifts: np.ndarray = 5 * (np.arange(chunks_count) - value_starts[value_ids])
+
+    values: np.ndarray = np.bitwise_or.reduceat((chunks & 0x1f) << shifts, value_starts)
+    deltas: np.ndarray = np.where(values & 1, ~(values >> 1), values >> 1)
+    deltas = deltas[:len(deltas) // 2 * 2].reshape(-1, 2)
+
+    return np.cumsum(deltas, axis=0) / 10**precision
+
+
+def _haversine_sq(lat0: float, lng0: float, cos_lat0: float,
+                  lats: np.ndarray, lngs: np.ndarray, cos_lats: np.ndarray) -> np.ndarray:
+    """
+    Calculate haversine term between coordinate and array of coordinates.
+    The term is monotone in the great-circle distance, so it can be compared instead of the distance itself.
+    Cosines of lattitudes are passed precomputed, so they are not recalculated on every call.
+
+    Args:
+        lat0 (float): Lattitude of coordinate (in radians).
+        lng0 (float): Longtitude of coordinate (in radians).
+        cos_lat0 (float): Cosine of lattitude of coordinate.
+        lats (np.ndarray): Lattitudes of coordinates (in radians).
+        lngs (np.ndarray): Longtitudes of coordinates (in radians).
+        cos_lats (np.ndarray): Cosines of lattitudes of coordinates.
+
+    Returns:
+        np.ndarray: haversine term for each coordinate.
+    """
+
+    return np.square(np.sin((lats - lat0) / 2)) + cos_lat0 * cos_lats * np.square(np.sin((lngs - lng0) / 2))
 
 
 class RouteAPI:
@@ -18,9 +98,16 @@ class RouteAPI:
     __SECONDS_IN_HOUR : int = 3600
     __SECONDS_IN_MINUTE : int = 60
 
-    def __init__(self, API_key: str):
+    def __init__(self, API_key: str, client: googlemaps.Client | None = None):
+        """
+        Args:
+            API_key (str): Key of Google Maps API.
+            client (googlemaps.Client | None, optional): Client of Google Maps API, which can be shared with other objects
+            to reuse its connections. If None, new client is created. Defaults to None.
+        """
+
         self.__API_key = API_key
-        self.__gmaps = googlemaps.Client(self.__API_key)
+        self.__gmaps = client if client is not None else googlemaps.Client(self.__API_key)
 
     def get_routes(self, origin: str | Dict | Tuple | List, destination: str | Dict | Tuple | List,
                    alternatives: bool = False, waypoints: List[str | Dict | Tuple | List] = None) -> List[Dict]:
@@ -86,7 +173,7 @@ class RouteAPI:
         return duration_and_distance
 
     def get_stop_points(self, route: Dict, distance_between_points: int = __DEFAULT_DISTANCE_BETWEEN_POINTS,
-                        traveled_distance: int = 0, only_first: bool = False) -> List[Dict]:
+                        traveled_distance: int = 0, only_first: bool = False) -> List[StopPoint]:
         """
         Calculate points on the route with indicated distance between each other.
 
@@ -99,8 +186,8 @@ class RouteAPI:
             If False, all stop points on the route are returned. Defaults to False.
 
         Returns:
-            List[Dict]: list of points on the route.
-            Point consists of dictionary which contains lattitude, longtitude and distance (in meters) on the route.
+            List[StopPoint]: list of points on the route.
+            Point is a named tuple which contains lattitude, longtitude and distance (in meters) on the route.
             Distance is not entirely precise. Some diviation from reality is possible due to calculatation in floating point numbers.
         """
 
@@ -109,7 +196,7 @@ class RouteAPI:
         return points
 
     def get_point_on_route(self, route: Dict, coordinate: Dict, distance: int = None, time: int = None,
-                           speed: int = None) -> Tuple[Dict | None, bool]:
+                           speed: int = None) -> Tuple[StopPoint | None, bool]:
         """
         Get point on the route in distance or in time (with indicated speed).
         Method receives coordinate of object, defines where it is located on the route and calculates point on the route
@@ -124,7 +211,7 @@ class RouteAPI:
             speed (int): Speed of object (in meters per seconds). Defaults to None.
 
         Returns:
-            Tuple[Dict | None, bool]: Coordinate of point on the route, indication whether point is an end of the route.
+            Tuple[StopPoint | None, bool]: Coordinate of point on the route, indication whether point is an end of the route.
             If True, the end of the route was returned. Otherwise, False.
             If end of the route is closer to the object, than indicated distance, then the end of the route will be returned.
         """
@@ -135,12 +222,12 @@ class RouteAPI:
             distance = int(distance)
         
         reached_route_end: bool = False
-        predicted_point: Dict | None = None
-        step_ind: int | None = self.__locate_step(route["steps"], coordinate)
+        predicted_point: StopPoint | None = None
+        step_ind, coordinate_ind = self.__locate_step(route, coordinate)
 
         if step_ind is not None:
             left_step_in_current_step: Dict | None = self.__calculate_left_step(
-                route["steps"][step_ind], coordinate)
+                route["steps"][step_ind], coordinate_ind)
 
             left_route = {
                 "steps": route["steps"][step_ind + 1:]
@@ -156,22 +243,25 @@ class RouteAPI:
                 predicted_point = predicted_points[0]
             else:
                 reached_route_end = True
-                predicted_point = {
-                    "lat" : route["end_location"]["lat"],
-                    "lng" : route["end_location"]["lng"],
-                    "distance" : full_distance
-                }
+                predicted_point = self.__init_stop_point(
+                    route["end_location"]["lat"], route["end_location"]["lng"], full_distance)
 
         return predicted_point, reached_route_end
 
     def __locate_stop_points(self, route: Dict, distance_between_points: int = __DEFAULT_DISTANCE_BETWEEN_POINTS,
-                             traveled_distance: int = 0, only_first: bool = False) -> Tuple[List[Dict], int, int]:
+                             traveled_distance: int = 0, only_first: bool = False) -> Tuple[List[StopPoint], int, int]:
         
-        points : List[Dict] = list()
-        full_distance : int = 0
+        points : List[StopPoint] = list()
         distance : int = traveled_distance % distance_between_points
 
-        for step in route["steps"]:
+        # steps before the one, where the first stop point is located, are skipped
+        cumulative_distances : np.ndarray = self.__get_cumulative_step_distances(route)
+        start_step_ind : int = int(np.searchsorted(
+            cumulative_distances, distance_between_points - distance, side="left"))
+        full_distance : int = int(cumulative_distances[start_step_ind - 1]) if start_step_ind > 0 else 0
+        distance += full_distance
+
+        for step in route["steps"][start_step_ind:]:
             distance += step["distance"]
             full_distance += step["distance"]
 
@@ -185,130 +275,158 @@ class RouteAPI:
 
         return points, full_distance, distance
 
-    def __locate_step(self, steps: List[Dict], coordinate: Dict) -> int | None:
-        step_ind: int | None = None
-        min_length_to_coordinate: float = float("inf")
+    def __locate_step(self, route: Dict, coordinate: Dict) -> Tuple[int | None, int | None]:
+        self.__prepare_route(route)
+        coordinates_rad: np.ndarray = route["_steps_rad"]
 
-        for ind, step in enumerate(steps):
-            coordinate_ind, length_to_coordinate = self.__locate_coordinate(
-                decode(step["polyline"]), coordinate)
+        if len(coordinates_rad) == 0:
+            return None, None
 
-            if coordinate_ind is not None and length_to_coordinate < min_length_to_coordinate:
-                min_length_to_coordinate = length_to_coordinate
-                step_ind = ind
+        # closest coordinate is searched among vertices of all steps at once,
+        # the step is defined by the position of the coordinate in concatenated array
+        lat0, lng0, cos_lat0 = self.__convert_coordinate_to_radians(coordinate)
+        haversine_terms: np.ndarray = _haversine_sq(
+            lat0, lng0, cos_lat0, coordinates_rad[:, 0], coordinates_rad[:, 1], route["_steps_cos"])
+        closest_coordinate_ind: int = int(haversine_terms.argmin())
 
-        return step_ind
+        # index of the coordinate inside the step is returned as well, so that it is not located again
+        step_ind: int = int(np.searchsorted(route["_steps_ends"], closest_coordinate_ind, side="right"))
+        step_start: int = int(route["_steps_ends"][step_ind]) - len(route["steps"][step_ind]["_poly_rad"])
 
-    def __calculate_left_step(self, step: Dict, coordinate: Dict) -> Dict | None:
-        left_step: Dict | None = None
-        polyline_coordinates: List[Tuple[float, float]] = decode(
-            step["polyline"])
-        sector_lengths, polyline_length = self.__calculate_sector_lengths(
-            polyline_coordinates)
+        return step_ind, closest_coordinate_ind - step_start
 
-        coordinate_ind, _ = self.__locate_coordinate(
-            polyline_coordinates, coordinate)
+    def __calculate_left_step(self, step: Dict, coordinate_ind: int) -> Dict | None:
+        left_step: Dict | None = None
+        self.__prepare_step(step)
+        polyline_coordinates: np.ndarray = step["_poly_np"]
+        sector_lengths: np.ndarray = step["_sector_lengths"]
+        polyline_length: float = step["_polyline_length"]
 
-        if coordinate_ind is not None and coordinate_ind != len(polyline_coordinates) - 1 and step["distance"] > 0 and polyline_length > 0:
-            distance_in_coordinate: float = 0.0
-            for ind in range(coordinate_ind, len(sector_lengths)):
-                distance_in_coordinate += sector_lengths[ind]
+        if coordinate_ind != len(polyline_coordinates) - 1 and step["distance"] > 0 and polyline_length > 0:
+            distance_in_coordinate: float = float(sector_lengths[coordinate_ind:].sum())
 
             if distance_in_coordinate > 0.0:
+                left_coordinates: np.ndarray = polyline_coordinates[coordinate_ind:]
                 left_step: Dict = {
-                    "start_location": {
-                        "lat": polyline_coordinates[coordinate_ind][0],
-                        "lng": polyline_coordinates[coordinate_ind][1],
-                    },
                     "end_location": {
-                        "lat": polyline_coordinates[-1][0],
-                        "lng": polyline_coordinates[-1][1],
+                        "lat": float(left_coordinates[-1, 0]),
+                        "lng": float(left_coordinates[-1, 1]),
                     },
-                    "polyline": encode(polyline_coordinates[coordinate_ind:]),
                     "distance": int(step["distance"] / polyline_length * distance_in_coordinate),
                     "duration": None,
+                    "_poly_np": left_coordinates,
+                    "_poly_rad": step["_poly_rad"][coordinate_ind:],
+                    "_poly_cos": step["_poly_cos"][coordinate_ind:],
+                    "_sector_lengths": sector_lengths[coordinate_ind:],
+                    "_polyline_length": distance_in_coordinate,
                 }
 
         return left_step
 
-    @staticmethod
-    def __locate_coordinate(coordinates: List[Tuple[float, float]], locating_coordinate: Dict) -> Tuple[int | None, float]:
-        closest_coordinate_ind: int | None = None
-        smallest_distance: float = float("inf")
+    @classmethod
+    def __prepare_step(cls, step: Dict) -> Dict:
+        # polyline of the step is decoded only once, all consumers read cached values
+        if "_poly_np" not in step:
+            step["_poly_np"] = _decode_np(step["polyline"])
+            step["_poly_rad"] = np.radians(step["_poly_np"])
+            step["_poly_cos"] = np.cos(step["_poly_rad"][:, 0])
+            step["_sector_lengths"], step["_polyline_length"] = cls.__calculate_sector_lengths(
+                step["_poly_np"], step["_poly_rad"])
 
-        for ind, coordinate in enumerate(coordinates):
-            x, y = coordinate
-            x_distance: float = locating_coordinate["lat"] - x
-            y_distance: float = locating_coordinate["lng"] - y
-            distance: float = sqrt(x_distance**2 + y_distance**2)
+        return step
 
-            if distance < smallest_distance:
-                smallest_distance = distance
-                closest_coordinate_ind = ind
+    @classmethod
+    def __prepare_route(cls, route: Dict) -> Dict:
+        # vertices of all steps are concatenated, so that the closest step can be found in one pass
+        if "_steps_rad" not in route:
+            steps: List[Dict] = [cls.__prepare_step(step) for step in route["steps"]]
+
+            route["_steps_rad"] = np.concatenate(
+                [step["_poly_rad"] for step in steps] + [np.empty((0, 2), dtype=np.float64)])
+            route["_steps_cos"] = np.concatenate(
+                [step["_poly_cos"] for step in steps] + [np.empty(0, dtype=np.float64)])
+            route["_steps_ends"] = np.cumsum([len(step["_poly_rad"]) for step in steps], dtype=np.int64)
 
-        return closest_coordinate_ind, smallest_distance
+        return route
 
     @staticmethod
-    def __calculate_sector_lengths(coordinates: List) -> Tuple[List, float]:
-        polyline_length = 0.0
-        sector_lengths = list()
+    def __get_cumulative_step_distances(route: Dict) -> np.ndarray:
+        if "_cum_step_dist" not in route:
+            route["_cum_step_dist"] = np.cumsum(
+                [step["distance"] for step in route["steps"]], dtype=np.int64)
 
-        for ind in range(0, len(coordinates) - 1):
-            x_sector_length = coordinates[ind][0] - coordinates[ind+1][0]
-            y_sector_length = coordinates[ind][1] - coordinates[ind+1][1]
-            sector_length = sqrt(x_sector_length**2 + y_sector_length**2)
+        return route["_cum_step_dist"]
 
-            sector_lengths.append(sector_length)
-            polyline_length += sector_length
+    @staticmethod
+    def __convert_coordinate_to_radians(coordinate: Dict) -> Tuple[float, float, float]:
+        lat_rad: float = radians(coordinate["lat"])
 
-        return sector_lengths, polyline_length
+        return lat_rad, radians(coordinate["lng"]), cos(lat_rad)
 
     @staticmethod
-    def __init_stop_point(lat: float, lng: float, distance: int) -> Dict:
-        stop_point = {
-            "lat": lat,
-            "lng": lng,
-            "distance": distance,
-        }
+    def __calculate_sector_lengths(coordinates: np.ndarray, coordinates_rad: np.ndarray) -> Tuple[np.ndarray, float]:
+        # longtitude differences are scaled by cosine of mean lattitude of the sector
+        lats_rad: np.ndarray = coordinates_rad[:, 0]
+        mean_lat_cos: np.ndarray = np.cos((lats_rad[:-1] + lats_rad[1:]) / 2)
+        sector_diffs: np.ndarray = np.diff(coordinates, axis=0)
+        sector_lengths: np.ndarray = np.hypot(sector_diffs[:, 0], sector_diffs[:, 1] * mean_lat_cos)
+
+        return sector_lengths, float(sector_lengths.sum())
 
-        return stop_point
+    @staticmethod
+    def __init_stop_point(lat: float, lng: float, distance: int) -> StopPoint:
+        return StopPoint(lat, lng, distance)
 
     @classmethod
     def __aproximate_stop_points(cls, step: Dict, distance: int, distance_between_points: int,
-                                 full_distance: int, only_first: bool = False) -> Tuple[List[Dict], int]:
+                                 full_distance: int, only_first: bool = False) -> Tuple[List[StopPoint], int]:
 
-        points : List[Dict] = list()
+        points : List[StopPoint] = list()
         new_distance : int = 0
-        coordinates : List[Tuple[float, float]] = decode(step["polyline"])
+        coordinates : np.ndarray = cls.__prepare_step(step)["_poly_np"]
 
         if step["distance"] > 0 and len(coordinates) > 0:
-            sector_lengths, polyline_length = cls.__calculate_sector_lengths(
-                coordinates)
+            sector_lengths : np.ndarray = step["_sector_lengths"]
+            polyline_length : float = step["_polyline_length"]
 
-            first_stop_point_percent : float = abs(
-                distance_between_points - (distance - step["distance"])) / step["distance"]
+            first_stop_point_distance : float = abs(distance_between_points - (distance - step["distance"]))
+            first_stop_point_percent : float = first_stop_point_distance / step["distance"]
             next_stop_point_percent : float = distance_between_points / \
                 step["distance"]
 
-            current_polyline : float = 0.0
-            current_percent : float = first_stop_point_percent
             stop_point_on_polyline : float = first_stop_point_percent * polyline_length
             next_stop_point_length : float = next_stop_point_percent * polyline_length
 
-            for ind, sector_length in enumerate(sector_lengths):
-                current_polyline += sector_length
-
-                if current_polyline > stop_point_on_polyline:
-                    points.append(cls.__init_stop_point(
-                        coordinates[ind][0], coordinates[ind][1],
-                        full_distance - step["distance"] + int(current_percent * step["distance"])))
-
-                    current_percent += next_stop_point_percent
-                    stop_point_on_polyline += next_stop_point_length
-                    new_distance = full_distance - points[-1]["distance"]
-
-                    if only_first:
-                        break
+            stop_points_count : int = 1
+            if not only_first and next_stop_point_length > 0:
+                stop_points_count = ceil(polyline_length / next_stop_point_length) + 1
+
+            stop_point_numbers : np.ndarray = np.arange(stop_points_count)
+            stop_point_positions : np.ndarray = stop_point_on_polyline + next_stop_point_length * stop_point_numbers
+            cumulative_lengths : np.ndarray = np.cumsum(sector_lengths)
+            stop_point_inds : np.ndarray = np.searchsorted(cumulative_lengths, stop_point_positions, side="right")
+
+            on_polyline : np.ndarray = stop_point_inds < len(cumulative_lengths)
+            stop_point_inds = stop_point_inds[on_polyline]
+            stop_point_positions = stop_point_positions[on_polyline]
+            stop_point_distances : np.ndarray = (first_stop_point_distance + distance_between_points *
+                                                 stop_point_numbers[on_polyline]).astype(np.int64)
+            stop_point_distances += full_distance - step["distance"]
+
+            # stop point is interpolated inside the sector, which contains its position on the polyline
+            sector_starts : np.ndarray = np.where(
+                stop_point_inds > 0, cumulative_lengths[stop_point_inds - 1], 0.0)
+            sector_fractions : np.ndarray = (stop_point_positions - sector_starts) / \
+                (cumulative_lengths[stop_point_inds] - sector_starts)
+            stop_point_coordinates : np.ndarray = coordinates[stop_point_inds] + sector_fractions[:, np.newaxis] * \
+                (coordinates[stop_point_inds + 1] - coordinates[stop_point_inds])
+
+            points = [cls.__init_stop_point(lat, lng, point_distance)
+                      for (lat, lng), point_distance in zip(stop_point_coordinates.tolist(),
+                                                            stop_point_distances.tolist())]
+
+            if len(points) > 0:
+                new_distance = full_distance - points[-1].distance
 
         if len(points) == 0:
             points.append(
@@ -340,21 +458,20 @@ class RouteAPI:
             for raw_step in leg["steps"]:
                 step = dict()
 
-                step["start_location"] = raw_step["start_location"]
                 step["end_location"] = raw_step["end_location"]
                 step["distance"] = raw_step["distance"]["value"]
                 step["duration"] = raw_step["duration"]["value"]
                 step["polyline"] = raw_step["polyline"]["points"]
+                cls.__prepare_step(step)
 
                 route["steps"].append(step)
+
+        cls.__get_cumulative_step_distances(route)
         
         route["distance_text"] = cls.__convert_meters_to_distance_text(route["distance"])
         route["duration_text"] = cls.__convert_seconds_to_duration_text(route["duration"])
 
         route["polyline"] = raw_route['overview_polyline']["points"]
-        route["summary"] = raw_route["summary"]
-        route["warnings"] = raw_route["warnings"]
-        route["waypoint_order"] = raw_route["waypoint_order"]
         
         return route
     
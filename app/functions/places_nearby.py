@@ -1,26 +1,36 @@
-import os
-import sys
+import numpy as np
 import googlemaps # library for Google Maps API. Use 'pip install googlemaps' to install
 
-# Modifying the root path for imports
-current = os.path.dirname(os.path.realpath(__file__))
-parent = os.path.dirname(current)
-sys.path.append(parent)
 
-import API_.route_API as route_API # file with class RouteAPI
-from geopy.distance import geodesic
+EARTH_RADIUS_M = 6_371_000 # mean radius of the Earth in meters
+
+
+def _haversine_m(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Calculates great-circle distances from one coordinate to array of coordinates with the haversine formula
+    :param lat: latitude of the coordinate
+    :param lng: longitude of the coordinate
+    :param lats: latitudes of the coordinates
+    :param lngs: longitudes of the coordinates
+    :return: array of distances in meters"""
+
+    phi, phis = np.radians(lat), np.radians(lats)
+    a = np.square(np.sin((phis - phi) / 2)) + np.cos(phi) * np.cos(phis) * np.square(np.sin(np.radians(lngs - lng) / 2))
+
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
 
 
 class PlacesNearby:
     """Class for interacting with Google Maps API 
     to get places nearby given coordinates, radius and types of places."""
 
-    def __init__(self, api_key: str):
-        """Initializes the class with the API key."""
-        self.gmaps = googlemaps.Client(key=api_key)
-        self.places = []
+    MAX_DESTINATIONS_PER_REQUEST = 25 # limit of destinations in one Distance Matrix request
+
+    def __init__(self, api_key: str, client: googlemaps.Client | None = None):
+        """Initializes the class with the API key.
+        :param api_key: key of Google Maps API
+        :param client: client of Google Maps API to share connections with other objects, new client is created if None"""
+        self.gmaps = client if client is not None else googlemaps.Client(key=api_key)
         self.shortlist = []
-        self.route_object = route_API.RouteAPI(API_key=api_key)
 
 
     def get_places(self, lat: float, lng: float, radius: int, types: list[str]) -> list[dict]:
@@ -33,7 +43,26 @@ class PlacesNearby:
          A full list of supported types: 
          https://developers.google.com/maps/documentation/places/web-service/place-types"""
 
-        places = []
+        places_by_type = self.get_places_multi(lat, lng, radius, types)
+
+        # remove duplicates, place of several types is the same object in all lists
+        unique_places = {id(place): place for type_places in places_by_type.values() for place in type_places}
+
+        return list(unique_places.values())
+
+
+    def get_places_multi(self, lat: float, lng: float, radius: int, types: list[str]) -> dict[str, list[dict]]:
+        """Given coordinates, radius and types, retrieves objects within a certain radius grouped by type.
+        Filters and driving distances requests are shared between all types.
+         :param lat: latitude
+         :param lng: longitude
+         :param radius: radius
+         :param types: list of types of places (fast_food_restaurant, coffee_shop and so on)
+         :return: dictionary with type as key and list of dictionaries with keys 'distance', 'name', 'rating', 
+         'vicinity' and 'location' as value"""
+
+        places = {}
+        places_by_type = {place_type: {} for place_type in types}
 
         for place_type in types:
             query_result = self.gmaps.places_nearby(
@@ -42,40 +71,61 @@ class PlacesNearby:
                 #max_price=4,
                 type=place_type)
 
+            # duplicates and places with price level higher than 2 are skipped in one pass
             for place in query_result.get('results', []):
-                place_info = {
-                    'name' : place.get('name', 'No name'), 
-                    'rating' : place.get('rating', 'No rating'), 
-                    'vicinity' : place.get('vicinity', 'No vicinity'), # address
-                    'location' : place.get('geometry', {}).get('location', 'No location'), # dict with keys 'lat' and 'lng'
-                    'distance' : self.route_object.get_duration_and_distance(
-                        (lat, lng), (place.get('geometry', {}).get('location', 'No location')))['distance'],
-                    'price_level' : place.get('price_level', 'No price level')
-                }
-                places.append(place_info) # places is a list of dictionaries
-
-        # remove duplicates
-        unique_places = {f"{place['name']} | {place['location']['lat']} | {place['location']['lng']}": place for place in places} 
-        
-        self.places = list(unique_places.values())
-
-        # remove places that are further than radius
-        self.places = [place for place in self.places if geodesic(
-            (lat, lng), (place['location']['lat'], place['location']['lng'])).meters <= radius]
-        
-        # removes places with price level higher than 2
-        self.places = [place for place in self.places 
-                       if (isinstance(place['price_level'], int) and place['price_level'] <= 2) 
-                       or place['price_level'] == 'No price level']
-
-        return self.places
+                name = place.get('name', 'No name')
+                location = place.get('geometry', {}).get('location', 'No location') # dict with keys 'lat' and 'lng'
+                price_level = place.get('price_level', 'No price level')
+
+                if not isinstance(location, dict):
+                    continue
+
+                key = f"{name} | {location['lat']} | {location['lng']}"
+
+                if (key not in places_by_type[place_type]
+                        and ((isinstance(price_level, int) and price_level <= 2) or price_level == 'No price level')):
+                    # place of several types is shared between the types
+                    places_by_type[place_type][key] = places.setdefault(key, {
+                        'name' : name, 
+                        'rating' : place.get('rating', 'No rating'), 
+                        'vicinity' : place.get('vicinity', 'No vicinity'), # address
+                        'location' : location,
+                        'price_level' : price_level
+                    })
+
+        candidates = list(places.values())
+
+        # remove places that are further than radius, distances to all places are calculated at once
+        if len(candidates) > 0:
+            locations = np.array([(place['location']['lat'], place['location']['lng']) for place in candidates])
+            within_radius = _haversine_m(lat, lng, locations[:, 0], locations[:, 1]) <= radius
+            candidates = [place for place, is_within in zip(candidates, within_radius) if is_within]
+
+        # driving distances are requested in batches only for the places which passed the filters
+        reachable_places = set()
+
+        for start in range(0, len(candidates), self.MAX_DESTINATIONS_PER_REQUEST):
+            end = start + self.MAX_DESTINATIONS_PER_REQUEST
+            matrix = self.gmaps.distance_matrix(
+                origins=[(lat, lng)],
+                destinations=[place['location'] for place in candidates[start:end]],
+                mode='driving')
+
+            for place_info, element in zip(candidates[start:end], matrix['rows'][0]['elements']):
+                # places which cannot be reached by car are skipped
+                if element.get('status') == 'OK':
+                    place_info['distance'] = element['distance']['value']
+                    reachable_places.add(id(place_info))
+
+        return {place_type: [place for place in type_places.values() if id(place) in reachable_places]
+                for place_type, type_places in places_by_type.items()}
     
 
-    def make_shortlist(self) -> list[dict]:
+    def make_shortlist(self, places: list[dict]) -> list[dict]:
         """Given a list of places, returns a shortlist of the 3 closest places.
         :param places: list of dictionaries with keys 'name', 'rating', 'vicinity' and 'location'
         :return: list of dictionaries with keys 'distance', 'name', 'rating', 'vicinity' and 'location'"""
 
-        closest_places = sorted(self.places, key=lambda x: x['distance'])[:3]
+        closest_places = sorted(places, key=lambda x: x['distance'])[:3]
 
         return closest_places
\ No newline at end of file
@@ -3,8 +3,10 @@ import re
 import sys 
 import folium
 import polyline
+import googlemaps
 import streamlit as st
 
+from concurrent.futures import ThreadPoolExecutor
 from folium import PolyLine, Marker, Icon
 from streamlit_folium import st_folium
 
@@ -17,14 +19,14 @@ from config import API_KEY
 from API_.route_API import RouteAPI
 from functions.places_nearby import PlacesNearby
 
+# Regular expression for a valid coordinate string, compiled once instead of on every call
+_COORD_RE = re.compile(r'^\s*(-?\d+\.\d+)\s*,\s*(-?\d+\.\d+)\s*$')
+
 # Additional functions
 
 def convert_to_tuple(coord_string):
-    # Define the regular expression for a valid coordinate string
-    coord_pattern = re.compile(r'^\s*(-?\d+\.\d+)\s*,\s*(-?\d+\.\d+)\s*$')
-    
     # Match the string against the pattern
-    match = coord_pattern.match(coord_string)
+    match = _COORD_RE.match(coord_string)
     
     if match:
         # Extract the coordinates and convert them to float
@@ -72,11 +74,54 @@ def calculate_zoom_level(bounds):
     else:
         return 7
 
+# Initialize the Google Maps client shared by all APIs, so that they reuse the same connections
+_SHARED_GMAPS = googlemaps.Client(key=API_KEY, timeout=10)
+
 # Initialize the RouteAPI
-route_API = RouteAPI(API_KEY)
+route_API = RouteAPI(API_KEY, client=_SHARED_GMAPS)
 
 # Initialize the PlacesNearby
-places_API = PlacesNearby(API_KEY)
+places_API = PlacesNearby(API_KEY, client=_SHARED_GMAPS)
+
+# Cached API requests, so that Streamlit reruns with the same inputs do not repeat them
+
+@st.cache_data(ttl=3600)
+def get_routes(origin, destination, alternatives=False, waypoints=()):
+    return route_API.get_routes(origin, destination, alternatives=alternatives, waypoints=list(waypoints) or None)
+
+class PlacesNotCached(Exception):
+    # Raised by get_cached_places for the points which are not in the cache yet
+    pass
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_cached_places(lat, lng, radius, types, _places=None):
+    # Streamlit does not cache exceptions, so a miss stays a miss until places are passed in
+    if _places is None:
+        raise PlacesNotCached
+    return _places
+
+def get_places_near_points(points, types):
+    # Places are cached per (lat, lng, radius, types) and looked up from the script thread.
+    # Only the missing points are requested concurrently, workers call the uncached API
+    places = {}
+    missing_points = []
+
+    for point in dict.fromkeys(points):
+        try:
+            places[point] = get_cached_places(*point, types)
+        except PlacesNotCached:
+            missing_points.append(point)
+
+    if missing_points:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            fetched_places = list(executor.map(
+                lambda point: places_API.get_places_multi(point[0], point[1], radius=point[2], types=list(types)),
+                missing_points))
+
+        for point, point_places in zip(missing_points, fetched_places):
+            places[point] = get_cached_places(*point, types, _places=point_places)
+
+    return [places[point] for point in points]
 
 # Streamlit page configuration
 st.set_page_config(
@@ -101,7 +146,7 @@ drive_between_stops = st.sidebar.slider(
 # 48.387598, -4.459093	
 
 # Get route
-routes = route_API.get_routes(convert_to_tuple(origin), convert_to_tuple(destination))
+routes = get_routes(convert_to_tuple(origin), convert_to_tuple(destination))
 
 # The best route choice
 route = routes[0]
@@ -114,27 +159,26 @@ stop_points = route_API.get_stop_points(route, distance_between_points= 23.61 *
 # st.write(route)
 # PLACES EXTRACTION 
 
-# get the list of cafes
-cafe_list_at_stops = []
-
-for dict_ in stop_points:
-    lat, lon = dict_['lat'], dict_['lng']
-    places = places_API.get_places(lat, lon, radius=20_000, types=['cafe'])
-    for place in places:
-        cafe_list_at_stops.append(place)
+place_types = ('cafe', 'parking')
 
-cafe_list = cafe_list_at_stops[:top_places] + places_API.get_places(lat=stop_point_begin['lat'], lng=stop_point_begin['lng'], radius=2000, types=['cafe'])[:top_places] + places_API.get_places(lat=stop_point_end['lat'], lng=stop_point_end['lng'], radius=2000, types=['cafe'])[:top_places]
+# points are (lat, lng, radius), the last two are the beginning and the end of the route
+places_by_point = get_places_near_points(
+    [(stop.lat, stop.lng, 20_000) for stop in stop_points]
+    + [(stop_point_begin['lat'], stop_point_begin['lng'], 2000), (stop_point_end['lat'], stop_point_end['lng'], 2000)],
+    place_types)
+places_at_stops_by_type, places_at_begin_by_type, places_at_end_by_type = \
+    places_by_point[:-2], places_by_point[-2], places_by_point[-1]
 
-# get the list of parkings
-parking_list_at_stops = []
+def collect_places(place_type):
+    # Collect places of given type near the stop points, the beginning and the end of the route
+    places_at_stops = [place for places_by_type in places_at_stops_by_type for place in places_by_type[place_type]]
+    return places_at_stops[:top_places] + places_at_begin_by_type[place_type][:top_places] + places_at_end_by_type[place_type][:top_places]
 
-for dict_ in stop_points:
-    lat, lon = dict_['lat'], dict_['lng']
-    places = places_API.get_places(lat, lon, radius=20_000, types=['parking'])
-    for place in places:
-        cafe_list_at_stops.append(place)
+# get the list of cafes
+cafe_list = collect_places('cafe')
 
-parking_list = parking_list_at_stops[:top_places] + places_API.get_places(lat=stop_point_begin['lat'], lng=stop_point_begin['lng'], radius=2000, types=['parking'])[:top_places] + places_API.get_places(lat=stop_point_end['lat'], lng=stop_point_end['lng'], radius=2000, types=['parking'])[:top_places]
+# get the list of parkings
+parking_list = collect_places('parking')
 
 
 # Remove steps from the route dictionary
@@ -190,8 +234,8 @@ for parking in parking_list:
 # Add markers for each cafe
 for stop in stop_points:
     stop_name = 'Take some rest at this point :)'
-    lat = stop['lat']
-    lng = stop['lng']
+    lat = stop.lat
+    lng = stop.lng
     
     # Create a marker with a custom icon
     marker = Marker(